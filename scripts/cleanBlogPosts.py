@@ -3,222 +3,315 @@
 Clean up blog post HTML files by removing Wix-specific markup and useless SVG files
 """
 
+import argparse
+import hashlib
+import json
 import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
+try:
+    # Optional: pip install google-re2 for linear-time matching of the
+    # lazy .*? block removals below, which backtrack in Python's re
+    import re2
+except ImportError:
+    re2 = None
+
 BLOG_POSTS_DIR = Path(__file__).parent.parent / "blog" / "posts"
 
-def clean_blog_post(html_path):
-    """Clean a single blog post HTML file"""
-    with open(html_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    original_content = content
-    
+# Sidecar recording each post's (mtime_ns, size) after it was last processed,
+# so re-runs skip untouched posts with a stat instead of reading them. Entries
+# are tied to a hash of this script, so editing the patterns invalidates them.
+CACHE_PATH = BLOG_POSTS_DIR / ".cleaned.json"
+CLEANER_HASH = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()
+
+# Below this many pending posts a plain loop beats the process pool's startup
+# cost (50 posts: ~3.5 ms serially vs ~14 ms through the pool)
+PARALLEL_MIN_POSTS = 100
+
+# Posts are cleaned as raw UTF-8 bytes, where \s only covers ASCII whitespace;
+# also accept the UTF-8 encodings of every other character \s matched on
+# decoded text (\x1c-\x1f, NEL, NBSP, U+1680, U+2000-U+200A, U+2028/9,
+# U+202F, U+205F and U+3000)
+WHITESPACE = (
+    rb'(?:[\s\x1c-\x1f]|\xc2[\x85\xa0]|\xe1\x9a\x80'
+    rb'|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)'
+)
+
+
+def _compile(pattern):
+    """Compile a bytes pattern whose whitespace classes also match Unicode spaces"""
+    return re.compile(pattern.replace(rb'\s', WHITESPACE))
+
+
+def _compile_dotall(pattern):
+    """Compile a DOTALL block pattern with RE2 when available, else with re"""
+    if re2 is not None:
+        # Latin-1 mode, so . and [^>] match any byte as they do in re; RE2's
+        # default UTF-8 mode would not match across invalid UTF-8 sequences
+        options = re2.Options()
+        options.encoding = re2.Options.Encoding.LATIN1
+        options.dot_nl = True
+        return re2.compile(pattern, options)
+    return re.compile(pattern, re.DOTALL)
+
+
+# Expand-image buttons left inside <figure> wrappers
+FIGURE_BUTTON_RE = _compile_dotall(rb'<button[^>]*>.*?</button>')
+
+
+def _strip_figure_buttons(match):
+    """Drop expand buttons from a matched <figure> block, leaving the image"""
+    opening, body, closing = match.groups()
+    if b'<button' not in body:
+        return match.group(0)
+    return opening + FIGURE_BUTTON_RE.sub(b'', body) + closing
+
+
+# Class names emitted by the Wix build the posts were scraped from
+WIX_CLASSES = (
+    b'Uz933', b'cZKur', b'_3mPCj', b'uUNDj', b'hV4Sgn', b'swgwDTg', b'laz8E8', b'h7K_lu',
+    b'G5Aa3J', b'YfFkQX', b'zkv91u', b'y5oGWU', b'Eu1LNI', b'PxeFnW', b'X22cAo',
+)
+WIX_DATA_ATTRS = (
+    b'ssr-src-done', b'load-done', b'pin-url', b'pin-media', b'rce-version',
+    b'content-hook', b'hook',
+)
+WIX_ARIA_LABELS = (
+    b'Share via', b'Expand image', b'Print Post', b'Like post', b'views', b'comments',
+)
+
+# Substrings every freshly scraped Wix post contains; a file with none of them
+# has already been cleaned, so the pattern table can be skipped entirely
+WIX_MARKERS = (
+    b'data-hook', b'Uz933', b'cZKur', b'aria-label="Share', b'<footer><div><div><section>',
+)
+
+# Every Wix attribute removal as one alternation, so the attribute-stripping
+# stage is a single scan of the file instead of one scan per attribute
+WIX_ATTR_PATTERNS = (
+    # Wix-specific data attributes (but keep important ones like src, alt)
+    rb'data-(?:' + b'|'.join(map(re.escape, WIX_DATA_ATTRS)) + rb')="[^"]*"',
+    # Wix-specific classes
+    rb'class="[^"]*(?:' + b'|'.join(map(re.escape, WIX_CLASSES)) + rb')[^"]*"',
+    # Role and aria attributes that are Wix-specific
+    rb'role="(?:img|status)"',
+    rb'aria-label="[^"]*(?:' + b'|'.join(map(re.escape, WIX_ARIA_LABELS)) + rb')[^"]*"',
+    rb'aria-(?:describedby|live|pressed)="[^"]*"',
+    rb'aria-hidden="true"',
+    rb'title=""',
+    rb'draggable="false"',
+    rb'fetchpriority="[^"]*"',
+)
+WIX_ATTR_RE = _compile(rb'\s+(?:' + b'|'.join(WIX_ATTR_PATTERNS) + rb')')
+
+
+# An element with only whitespace or a lone <br> inside
+EMPTY_ELEMENT_RE = _compile(rb'<(p|div|span)[^>]*>\s*(?:<br\s*/?>\s*)?</\1>')
+
+
+class _UntilStable:
+    """Pattern wrapper whose sub repeats until nothing more matches"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def sub(self, repl, content):
+        count = 1
+        while count:
+            content, count = self.pattern.subn(repl, content)
+        return content
+
+
+class _Literal:
+    """Fixed-string stand-in for a pattern; bytes.replace skips the regex engine"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def sub(self, repl, content):
+        return content.replace(self.text, repl)
+
+
+# Ordered (compiled pattern, replacement) pairs applied by clean_blog_post.
+# Compiled once at import so each file skips pattern parsing and re's cache.
+# A replacement may be a callable, which Pattern.sub passes each match to.
+# Entries with no regex syntax use _Literal instead of a compiled pattern.
+# Edits are byte-level on purpose: several (e.g. dropping </section></div>)
+# rewrite markup an HTML tree could not represent.
+PATTERNS = [
     # Remove nested Wix header (duplicate author info)
-    content = re.sub(
-        r'<div><header><div><div><div><ul><li>.*?</header>',
-        '',
-        content,
-        flags=re.DOTALL
-    )
-    
+    (_compile_dotall(rb'<div><header><div><div><div><ul><li>.*?</header>'), b''),
+
     # Remove section with share buttons at the top
     # Match from <section><div><div><div> (opening share section) to </section> (closing)
     # But be careful not to remove content sections
     # Look for section with share buttons pattern
-    content = re.sub(
-        r'<section><div><div><div><button aria-label="Share via.*?</section>',
-        '',
-        content,
-        flags=re.DOTALL
-    )
-    
+    (_compile_dotall(rb'<section><div><div><div><button aria-label="Share via.*?</section>'), b''),
+
     # Remove footer with share buttons, views, comments, like buttons
     # Match from <footer><div><div><section> to </footer> (but only the one inside blog-post-content)
-    content = re.sub(
-        r'<footer><div><div><section>.*?</section></div></div></footer>',
-        '',
-        content,
-        flags=re.DOTALL
-    )
-    
+    (_compile_dotall(rb'<footer><div><div><section>.*?</section></div></div></footer>'), b''),
+
     # Remove expand image buttons (various class names)
-    content = re.sub(
-        r'<button class="Uz933" type="button" aria-label="Expand image"><svg.*?</button>',
-        '',
-        content,
-        flags=re.DOTALL
-    )
-    content = re.sub(
-        r'<button class="wwXRO"[^>]*>.*?</button>',
-        '',
-        content,
-        flags=re.DOTALL
-    )
+    (_compile_dotall(rb'<button class="Uz933" type="button" aria-label="Expand image"><svg.*?</button>'), b''),
+    (_compile_dotall(rb'<button class="wwXRO"[^>]*>.*?</button>'), b''),
     # Remove buttons with svg inside that are expand/zoom buttons
-    content = re.sub(
-        r'<button[^>]*class="[^"]*[XxRrOo][^"]*"[^>]*><svg.*?</button>',
-        '',
-        content,
-        flags=re.DOTALL
-    )
-    
+    (_compile_dotall(rb'<button[^>]*class="[^"]*[XxRrOo][^"]*"[^>]*><svg.*?</button>'), b''),
+
     # Remove empty figure divs that only contained expand buttons
-    content = re.sub(
-        r'<figure><div><div[^>]*>.*?</div></div></figure>',
-        lambda m: re.sub(r'<button.*?</button>', '', m.group(0), flags=re.DOTALL) if '<button' in m.group(0) else m.group(0),
-        content,
-        flags=re.DOTALL
-    )
-    
+    (_compile_dotall(rb'(<figure><div><div[^>]*>)(.*?)(</div></div></figure>)'), _strip_figure_buttons),
+
     # Remove empty footer elements
-    content = re.sub(r'<footer><div></div></footer>', '', content)
-    content = re.sub(r'<footer><div><div></div></div></footer>', '', content)
-    
-    # Remove empty elements that create white space
-    # Remove empty paragraphs (with or without whitespace/br)
-    content = re.sub(r'<p[^>]*>\s*</p>', '', content)
-    content = re.sub(r'<p[^>]*>\s*<br>\s*</p>', '', content)
-    content = re.sub(r'<p[^>]*>\s*<br\s*/?>\s*</p>', '', content)
-    
-    # Remove empty spans with just br
-    content = re.sub(r'<span[^>]*>\s*<br>\s*</span>', '', content)
-    content = re.sub(r'<span[^>]*>\s*<br\s*/?>\s*</span>', '', content)
-    content = re.sub(r'<span[^>]*><br></span>', '', content)
-    
-    # Remove divs containing only empty spans with br
-    content = re.sub(r'<div[^>]*>\s*<span[^>]*>\s*<br>\s*</span>\s*</div>', '', content)
-    content = re.sub(r'<div[^>]*>\s*<span[^>]*>\s*<br\s*/?>\s*</span>\s*</div>', '', content)
-    content = re.sub(r'<div[^>]*>\s*<span[^>]*><br></span>\s*</div>', '', content)
-    
-    # Remove nested divs with just empty spans/br
-    content = re.sub(r'<div[^>]*><div[^>]*>\s*<span[^>]*>\s*<br>\s*</span>\s*</div></div>', '', content)
-    content = re.sub(r'<div[^>]*><div[^>]*>\s*<span[^>]*>\s*<br\s*/?>\s*</span>\s*</div></div>', '', content)
-    content = re.sub(r'<div[^>]*><div[^>]*dir="auto"[^>]*>\s*<span[^>]*><br></span>\s*</div></div>', '', content)
-    
-    # Clean up empty divs
-    content = re.sub(r'<div></div>', '', content)
-    content = re.sub(r'<div[^>]*>\s*</div>', '', content)
-    
+    (_Literal(b'<footer><div></div></footer>'), b''),
+    (_Literal(b'<footer><div><div></div></div></footer>'), b''),
+
+    # Remove empty elements that create white space: paragraphs, divs and spans
+    # holding nothing but whitespace or a single <br>, repeated so a div left
+    # empty by removing its span is caught too. Runs ahead of the section
+    # unwrapping and div-run collapse below, as the first of the two old
+    # empty-element blocks did (a second pass after them changed nothing in fuzzing).
+    # Repeating to a fixed point can bring a </section> and </div> together that
+    # the old single passes kept apart, so nested section/div wrappers can clean
+    # differently than before (the unwrap below then drops that pair)
+    (_UntilStable(EMPTY_ELEMENT_RE), b''),
+
     # Simplify nested section/div structure
     # Replace <section><div><div><div> with just the content
-    content = re.sub(
-        r'<section><div><div><div>',
-        '',
-        content
-    )
-    content = re.sub(
-        r'</section><footer><div></div></footer></div>',
-        '',
-        content
-    )
-    content = re.sub(
-        r'</section></div>',
-        '',
-        content
-    )
-    
+    (_Literal(b'<section><div><div><div>'), b''),
+    (_Literal(b'</section><footer><div></div></footer></div>'), b''),
+    (_Literal(b'</section></div>'), b''),
+
     # Clean up nested divs (be more careful)
     # Only simplify if we're sure it's safe
-    for _ in range(5):  # Multiple passes for nested structures
-        content = re.sub(r'<div><div>', '<div>', content)
-        content = re.sub(r'</div></div>', '</div>', content)
-    
-    # Remove any remaining empty paragraphs and divs
-    content = re.sub(r'<p[^>]*>\s*</p>', '', content)
-    content = re.sub(r'<div[^>]*>\s*</div>', '', content)
-    content = re.sub(r'<span[^>]*>\s*</span>', '', content)
-    
-    # Remove Wix-specific data attributes (but keep important ones like src, alt)
-    content = re.sub(r'\s+data-ssr-src-done="[^"]*"', '', content)
-    content = re.sub(r'\s+data-load-done="[^"]*"', '', content)
-    content = re.sub(r'\s+data-pin-url="[^"]*"', '', content)
-    content = re.sub(r'\s+data-pin-media="[^"]*"', '', content)
-    content = re.sub(r'\s+data-rce-version="[^"]*"', '', content)
-    content = re.sub(r'\s+data-content-hook="[^"]*"', '', content)
-    content = re.sub(r'\s+data-hook="[^"]*"', '', content)
-    
-    # Remove Wix-specific classes
-    content = re.sub(r'\s+class="[^"]*Uz933[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*cZKur[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*_3mPCj[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*uUNDj[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*hV4Sgn[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*swgwDTg[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*laz8E8[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*h7K_lu[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*G5Aa3J[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*YfFkQX[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*zkv91u[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*y5oGWU[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*Eu1LNI[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*PxeFnW[^"]*"', '', content)
-    content = re.sub(r'\s+class="[^"]*X22cAo[^"]*"', '', content)
-    
-    # Remove role and aria attributes that are Wix-specific
-    content = re.sub(r'\s+role="img"', '', content)
-    content = re.sub(r'\s+aria-label="[^"]*Share via[^"]*"', '', content)
-    content = re.sub(r'\s+aria-label="[^"]*Expand image[^"]*"', '', content)
-    content = re.sub(r'\s+aria-label="[^"]*Print Post[^"]*"', '', content)
-    content = re.sub(r'\s+aria-label="[^"]*Like post[^"]*"', '', content)
-    content = re.sub(r'\s+aria-describedby="[^"]*"', '', content)
-    content = re.sub(r'\s+aria-live="[^"]*"', '', content)
-    content = re.sub(r'\s+aria-pressed="[^"]*"', '', content)
-    content = re.sub(r'\s+aria-hidden="true"', '', content)
-    content = re.sub(r'\s+aria-label="[^"]*views[^"]*"', '', content)
-    content = re.sub(r'\s+aria-label="[^"]*comments[^"]*"', '', content)
-    content = re.sub(r'\s+role="status"', '', content)
-    content = re.sub(r'\s+title=""', '', content)
-    content = re.sub(r'\s+draggable="false"', '', content)
-    content = re.sub(r'\s+fetchpriority="[^"]*"', '', content)
-    
+    # Collapse a whole run of bare divs in one pass rather than halving it per pass.
+    # Runs start at two so a lone <div> is not a match: Pattern.sub hands back
+    # the input object untouched when nothing matches, instead of rebuilding it
+    (_compile(rb'(?:<div>){2,}'), b'<div>'),
+    (_compile(rb'(?:</div>){2,}'), b'</div>'),
+
+    # Remove Wix-specific data attributes, classes, and role/aria attributes
+    (WIX_ATTR_RE, b''),
+
     # Remove redundant images with empty alt attributes (often duplicates at the start)
-    # Remove images wrapped in section tags with empty alt
-    content = re.sub(r'<section><img alt=""[^>]*></section>', '', content)
-    content = re.sub(r'<section><img alt=""[^>]*/></section>', '', content)
+    # Remove images wrapped in section tags with empty alt ([^>]* also takes a self-closing /)
+    (_compile(rb'<section><img alt=""[^>]*></section>'), b''),
     # Remove standalone images with empty alt at the start of content
-    content = re.sub(r'<img alt="" src="[^"]*">', '', content)
-    content = re.sub(r'<img alt="" src="[^"]*"/>', '', content)
-    
+    (_compile(rb'<img alt="" src="[^"]*"/?>'), b''),
+
     # Remove empty spans
-    content = re.sub(r'<span class="[^"]*"></span>', '', content)
-    content = re.sub(r'<span></span>', '', content)
-    
+    (_compile(rb'<span(?: class="[^"]*")?></span>'), b''),
+
     # Remove empty buttons
-    content = re.sub(r'<button[^>]*></button>', '', content)
+    (_compile(rb'<button[^>]*></button>'), b''),
+
+    # Remove viewer and button IDs (Wix-specific); covers more-button-* too
+    (_compile(rb'\s+id="(?:viewer-|[^"]*-button-)[^"]*"'), b''),
+
+    # Clean up extra whitespace. \s* also spans newlines, so one pass collapses a
+    # run of any length, including whitespace-only lines that \n{3,} would miss
+    (_compile(rb'\n\s*\n\s*\n'), b'\n\n'),
+]
+
+# Bound sub methods, looked up once here rather than once per pattern per file
+SUBSTITUTIONS = [(pattern.sub, repl) for pattern, repl in PATTERNS]
+
+
+def _stat_key(path):
+    """Cheap change detector for a post: modification time and size"""
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_cache():
+    """Return the {post name: stat key} map, or {} if missing or stale"""
+    try:
+        cache = json.loads(CACHE_PATH.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('cleaner') != CLEANER_HASH:
+        return {}
+    posts = cache.get('posts')
+    if not isinstance(posts, dict):
+        return {}
+    # Drop malformed entries; those posts are simply processed again
+    return {name: key for name, key in posts.items() if isinstance(key, list)}
+
+
+def save_cache(posts):
+    """Persist the {post name: stat key} map for the next run"""
+    payload = {'cleaner': CLEANER_HASH, 'posts': posts}
+    CACHE_PATH.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding='utf-8')
+
+
+def clean_blog_post(html_path, write=True):
+    """Clean a single blog post HTML file; returns whether it needed cleaning"""
+    content = html_path.read_bytes()
+    if not any(marker in content for marker in WIX_MARKERS):
+        return False
     
-    # Remove viewer IDs (Wix-specific)
-    content = re.sub(r'\s+id="viewer-[^"]*"', '', content)
-    content = re.sub(r'\s+id="more-button-[^"]*"', '', content)
-    content = re.sub(r'\s+id="[^"]*-button-[^"]*"', '', content)
+    original_content = content
     
-    # Clean up extra whitespace
-    content = re.sub(r'\n\s*\n\s*\n', '\n\n', content)
+    for sub, repl in SUBSTITUTIONS:
+        content = sub(repl, content)
     
     if content != original_content:
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if write:
+            html_path.write_bytes(content)
         return True
     return False
 
 def main():
     """Process all blog post files"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--check", action="store_true",
+                        help="Report posts that still need cleaning and exit non-zero; do not rewrite.")
+    parser.add_argument("--force", action="store_true",
+                        help="Process every post, ignoring the cache of already-cleaned posts.")
+    args = parser.parse_args()
+    
     blog_posts = list(BLOG_POSTS_DIR.glob("*.html"))
     
     print(f"Found {len(blog_posts)} blog post files")
     
+    cache = {} if args.force else load_cache()
+    pending = [post_path for post_path in blog_posts if cache.get(post_path.name) != _stat_key(post_path)]
+    if len(pending) < len(blog_posts):
+        print(f"- Skipping {len(blog_posts) - len(pending)} unchanged since the last run")
+    
+    # Each post is independent CPU-bound regex work, so fan out across processes,
+    # but only for a batch big enough to repay starting the worker pool
+    clean = partial(clean_blog_post, write=not args.check)
+    if len(pending) >= PARALLEL_MIN_POSTS and (os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(clean, pending, chunksize=8))
+    else:
+        results = list(map(clean, pending))
+    
     cleaned = 0
-    for post_path in blog_posts:
-        if clean_blog_post(post_path):
+    for post_path, changed in zip(pending, results):
+        if changed:
             cleaned += 1
-            print(f"✓ Cleaned: {post_path.name}")
+            print(f"{'✗ Needs cleaning' if args.check else '✓ Cleaned'}: {post_path.name}")
         else:
             print(f"- No changes: {post_path.name}")
     
+    if args.check:
+        print(f"\n{cleaned} out of {len(blog_posts)} blog post files need cleaning")
+        return 1 if cleaned else 0
+    
+    # Drop posts that no longer exist, then record the current state of the rest
+    names = {post_path.name for post_path in blog_posts}
+    posts = {name: key for name, key in cache.items() if name in names}
+    for post_path in pending:
+        posts[post_path.name] = _stat_key(post_path)
+    save_cache(posts)
+    
     print(f"\n✓ Cleaned {cleaned} out of {len(blog_posts)} blog post files")
+    return 0
 
 if __name__ == "__main__":
-    main()
-
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Checks for scripts/cleanBlogPosts.py.
+
+The cleaner compiles its DOTALL block patterns with google-re2 when it is
+installed and with re otherwise; both engines must clean a post identically,
+including posts holding bytes that are not valid UTF-8.
+
+Run with:
+  python3 -m unittest discover -s tests -p 'test_*.py'
+"""
+from __future__ import annotations
+
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / "scripts" / "cleanBlogPosts.py"
+
+# A scraped Wix post fragment that hits every DOTALL block pattern, with a
+# stray invalid UTF-8 sequence inside each block
+WIX_FIXTURE = (
+    b'<article data-hook="post">'
+    b'<div><header><div><div><div><ul><li>Author \xff\xfe</li></ul></div></div></div></header></div>'
+    b'<section><div><div><div><button aria-label="Share via Facebook">\xff<svg></svg></button>'
+    b'</div></div></div></section>'
+    b'<p class="Uz933 x">Caf\xc3\xa9 \xe9 body\xc2\xa0text</p>'
+    b'<button class="Uz933" type="button" aria-label="Expand image"><svg>\xfe</svg></button>'
+    b'<button class="wwXRO" data-hook="zoom">\xff</button>'
+    b'<button class="foo oR"><svg>\x80</svg></button>'
+    b'<figure><div><div class="q"><img src="a.png" alt="\xe9">'
+    b'<button class="k">\xff</button></div></div></figure>'
+    b'<footer><div><div><section><button>\xfe like</button></section></div></div></footer>'
+    b'</article>\n'
+)
+
+
+def _load_cleaner(name, block_re2=False):
+    """Import the cleaner as a fresh module, optionally with re2 unimportable"""
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    modules = {"re2": None} if block_re2 else {}
+    with mock.patch.dict(sys.modules, modules):
+        spec.loader.exec_module(module)
+    return module
+
+
+def _clean(module, content):
+    for sub, repl in module.SUBSTITUTIONS:
+        content = sub(repl, content)
+    return content
+
+
+class CleanBlogPostsEngineTest(unittest.TestCase):
+    def test_re_fallback_when_re2_missing(self):
+        cleaner = _load_cleaner("clean_blog_posts_re", block_re2=True)
+        self.assertIsNone(cleaner.re2)
+        cleaned = _clean(cleaner, WIX_FIXTURE)
+        self.assertNotIn(b"<header>", cleaned)
+        self.assertNotIn(b"<button", cleaned)
+        self.assertNotIn(b"<footer>", cleaned)
+
+    def test_re2_matches_re_byte_for_byte(self):
+        with_re2 = _load_cleaner("clean_blog_posts_re2")
+        if with_re2.re2 is None:
+            self.skipTest("google-re2 is not installed")
+        without_re2 = _load_cleaner("clean_blog_posts_re", block_re2=True)
+        self.assertEqual(_clean(with_re2, WIX_FIXTURE), _clean(without_re2, WIX_FIXTURE))
+
+
+if __name__ == "__main__":
+    unittest.main()